@@ -3,16 +3,24 @@ Flask API for Document Classification Service
 Automatically categorizes uploaded documents into: Legal, HR, Finance, Medical, Technical
 """
 
-import os
 import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 import joblib
 import logging
+import numpy as np
 from functools import wraps
 
-from utils import extract_text_from_file, preprocess_text, load_model_and_vectorizer
+from utils import (
+    extract_text_from_bytes, preprocess_text, preprocess_texts, vectorize_texts,
+    load_model_and_vectorizer
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,12 +32,8 @@ CORS(app)
 
 # Configuration
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = 'temp_uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'docx'}
 
-# Create upload folder if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
 # Load model and vectorizer at startup
 try:
     model, vectorizer = load_model_and_vectorizer()
@@ -41,6 +45,30 @@ except Exception as e:
 # Categories
 CATEGORIES = ['Legal', 'HR', 'Finance', 'Medical', 'Technical']
 
+# Threads used to read and extract the files of one batch upload
+BATCH_IO_WORKERS = 4
+
+# LRU cache of preprocessed text keyed by SHA-1 of the uploaded bytes
+TEXT_CACHE_SIZE = 512
+_text_cache = OrderedDict()
+_text_cache_lock = threading.Lock()
+
+def get_cached_text(key):
+    """Return cached preprocessed text for an upload hash, or None"""
+    with _text_cache_lock:
+        processed_text = _text_cache.get(key)
+        if processed_text is not None:
+            _text_cache.move_to_end(key)
+        return processed_text
+
+def cache_text(key, processed_text):
+    """Store preprocessed text, evicting the least recently used entry"""
+    with _text_cache_lock:
+        _text_cache[key] = processed_text
+        _text_cache.move_to_end(key)
+        if len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -60,6 +88,31 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
+def load_upload_text(file):
+    """
+    Read and extract one document of a batch upload
+    Returns: (cache_key, processed_text, text, error); processed_text is set on a
+    cache hit, text when the document still needs preprocessing, error otherwise
+    """
+    if not allowed_file(file.filename):
+        return None, None, None, f'File type not supported. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'
+    
+    data = file.read()
+    cache_key = hashlib.sha1(data).hexdigest()
+    processed_text = get_cached_text(cache_key)
+    if processed_text is not None:
+        return cache_key, processed_text, None, None
+    
+    try:
+        text = extract_text_from_bytes(data, file.filename.rsplit('.', 1)[1])
+    except Exception as e:
+        return cache_key, None, None, f'Classification failed: {str(e)}'
+    
+    if not text or len(text.strip()) < 10:
+        return cache_key, None, None, 'Could not extract sufficient text from document'
+    
+    return cache_key, None, text, None
+
 @app.route('/status', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -83,7 +136,7 @@ def classify_document():
     Classify uploaded document
     Returns: JSON with category and confidence score
     """
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
     
     try:
         # Check if file is present
@@ -104,63 +157,122 @@ def classify_document():
         if model is None or vectorizer is None:
             return jsonify({'error': 'Classification model not available'}), 503
         
-        # Save uploaded file temporarily
+        # Reuse preprocessed text for documents that were already classified
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        data = file.read()
+        cache_key = hashlib.sha1(data).hexdigest()
+        processed_text = get_cached_text(cache_key)
         
-        try:
-            # Extract text from document
-            text = extract_text_from_file(filepath)
+        if processed_text is None:
+            # Extract text from the uploaded bytes
+            text = extract_text_from_bytes(data, file.filename.rsplit('.', 1)[1])
             if not text or len(text.strip()) < 10:
                 return jsonify({'error': 'Could not extract sufficient text from document'}), 400
             
             # Preprocess text
             processed_text = preprocess_text(text)
-            
-            # Vectorize text
-            text_vector = vectorizer.transform([processed_text])
-            
-            # Make prediction
-            prediction = model.predict(text_vector)[0]
-            probabilities = model.predict_proba(text_vector)[0]
-            
-            # Get confidence score
-            confidence = float(max(probabilities))
-            predicted_category = CATEGORIES[prediction]
-            
-            # Calculate processing time
-            processing_time = time.time() - start_time
-            
-            # Log the classification
-            logger.info(f"Classified '{filename}' as '{predicted_category}' with confidence {confidence:.3f} in {processing_time:.3f}s")
-            
-            # Clean up temporary file
-            os.remove(filepath)
-            
-            response = {
-                'category': predicted_category,
-                'confidence': round(confidence, 3),
-                'processing_time': round(processing_time, 3),
-                'filename': filename,
-                'all_probabilities': {
-                    category: round(float(prob), 3) 
-                    for category, prob in zip(CATEGORIES, probabilities)
-                }
-            }
-            
-            return jsonify(response), 200
-            
-        except Exception as e:
-            # Clean up temporary file on error
-            if os.path.exists(filepath):
-                os.remove(filepath)
-            raise e
-            
+            cache_text(cache_key, processed_text)
+        
+        # Vectorize text
+        text_vector = vectorize_texts(vectorizer, (processed_text,))
+        
+        # Make prediction from a single probability pass
+        probabilities = model.predict_proba(text_vector)[0]
+        prediction = int(np.argmax(probabilities))
+        
+        # Get confidence score
+        confidence = float(probabilities[prediction])
+        predicted_category = CATEGORIES[prediction]
+        
+        # Calculate processing time
+        processing_time = (time.perf_counter_ns() - start_time) / 1e9
+        
+        # Log the classification
+        logger.info("Classified '%s' as '%s' with confidence %.3f in %.3fs",
+                    filename, predicted_category, confidence, processing_time)
+        
+        response = {
+            'category': predicted_category,
+            'confidence': round(confidence, 3),
+            'processing_time': round(processing_time, 3),
+            'filename': filename,
+            'all_probabilities': dict(zip(CATEGORIES, probabilities.astype(np.float64).round(3).tolist()))
+        }
+        
+        return jsonify(response), 200
+        
+    except HTTPException:
+        # Let Flask's error handlers answer, e.g. 413 for oversized uploads
+        raise
     except Exception as e:
         logger.error(f"Classification error: {e}")
         return jsonify({'error': f'Classification failed: {str(e)}'}), 500
 
+@app.route('/classify_batch', methods=['POST'])
+@token_required
+def classify_batch():
+    """
+    Classify several uploaded documents in one request
+    Returns: JSON with one result per file, in upload order
+    """
+    start_time = time.perf_counter_ns()
+    
+    try:
+        files = request.files.getlist('files')
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        # Check if model is loaded
+        if model is None or vectorizer is None:
+            return jsonify({'error': 'Classification model not available'}), 503
+        
+        results = [None] * len(files)
+        processed_texts = [None] * len(files)
+        pending = []
+        
+        # Read and extract the uploads concurrently, keeping upload order
+        with ThreadPoolExecutor(max_workers=min(len(files), BATCH_IO_WORKERS)) as executor:
+            uploads = list(executor.map(load_upload_text, files))
+        
+        for index, (file, (cache_key, processed_text, text, error)) in enumerate(zip(files, uploads)):
+            if error is not None:
+                results[index] = {'filename': secure_filename(file.filename), 'error': error}
+            elif processed_text is not None:
+                processed_texts[index] = processed_text
+            else:
+                pending.append((index, cache_key, text))
+        
+        # Preprocess uncached documents together
+        for (index, cache_key, _), processed_text in zip(pending, preprocess_texts([text for _, _, text in pending])):
+            processed_texts[index] = processed_text
+            cache_text(cache_key, processed_text)
+        
+        # Vectorize and predict every classifiable document in one pass
+        valid = [index for index, processed_text in enumerate(processed_texts) if processed_text is not None]
+        if valid:
+            text_matrix = vectorize_texts(vectorizer, [processed_texts[index] for index in valid])
+            probability_matrix = model.predict_proba(text_matrix)
+            predictions = probability_matrix.argmax(axis=1).tolist()
+            rounded = probability_matrix.astype(np.float64).round(3).tolist()
+            for index, prediction, probabilities in zip(valid, predictions, rounded):
+                results[index] = {
+                    'category': CATEGORIES[prediction],
+                    'confidence': probabilities[prediction],
+                    'filename': secure_filename(files[index].filename),
+                    'all_probabilities': dict(zip(CATEGORIES, probabilities))
+                }
+        
+        processing_time = (time.perf_counter_ns() - start_time) / 1e9
+        logger.info("Classified batch of %d documents in %.3fs", len(files), processing_time)
+        
+        return jsonify({'results': results, 'processing_time': round(processing_time, 3)}), 200
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch classification error: {e}")
+        return jsonify({'error': f'Classification failed: {str(e)}'}), 500
+
 @app.route('/categories', methods=['GET'])
 def get_categories():
     """Get list of available categories"""
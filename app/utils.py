@@ -4,110 +4,153 @@ Utility functions for document processing and model management
 
 import os
 import re
-import string
+import math
 import joblib
+from joblib import Parallel, delayed
 import logging
-from typing import Tuple, Optional
+from io import BytesIO
+from functools import lru_cache
+from typing import List, Tuple
 
 import fitz  # PyMuPDF
 from docx import Document
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 from nltk.stem import PorterStemmer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import LogisticRegression
 import numpy as np
+import scipy.sparse as sp
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-
 # Initialize stemmer and stopwords
 stemmer = PorterStemmer()
-stop_words = set(stopwords.words('english'))
 
-def extract_text_from_pdf(file_path: str) -> str:
+# NLTK's English stopword list, inlined so no corpus has to be downloaded or read
+stop_words = frozenset([
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're",
+    "you've", "you'll", "you'd", 'your', 'yours', 'yourself', 'yourselves', 'he',
+    'him', 'his', 'himself', 'she', "she's", 'her', 'hers', 'herself', 'it', "it's",
+    'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which',
+    'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are',
+    'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do',
+    'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because',
+    'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against',
+    'between', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to',
+    'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again',
+    'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all',
+    'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no',
+    'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't',
+    'can', 'will', 'just', 'don', "don't", 'should', "should've", 'now', 'd', 'll',
+    'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't", 'couldn', "couldn't",
+    'didn', "didn't", 'doesn', "doesn't", 'hadn', "hadn't", 'hasn', "hasn't",
+    'haven', "haven't", 'isn', "isn't", 'ma', 'mightn', "mightn't", 'mustn',
+    "mustn't", 'needn', "needn't", 'shan', "shan't", 'shouldn', "shouldn't", 'wasn',
+    "wasn't", 'weren', "weren't", 'won', "won't", 'wouldn', "wouldn't"
+])
+
+# Feature space ceiling; accuracy saturates well below 10k features while memory keeps growing
+TFIDF_MAX_FEATURES = int(os.getenv('TFIDF_MAX_FEATURES', 10000))
+TFIDF_NGRAM_MAX = int(os.getenv('TFIDF_NGRAM_MAX', 2))
+
+# Below this many texts, worker start-up costs more than parallel preprocessing saves
+PARALLEL_MIN_BATCH = 32
+
+# Preprocessing worker processes for large batches; 1 keeps it serial, which the
+# gunicorn config defaults to since it already runs one worker per core
+PREPROCESS_N_JOBS = int(os.getenv('PREPROCESS_N_JOBS', -1))
+
+# Alphabetic tokens of 3+ characters; replaces the cleanup/tokenize passes
+_TOKEN_RE = re.compile(r'[a-z]{3,}')
+
+@lru_cache(maxsize=200000)
+def _stem(token: str) -> str:
+    """Stem a token, caching results since word frequencies are heavily skewed"""
+    return stemmer.stem(token)
+
+def extract_text_from_pdf(data: bytes) -> str:
     """
-    Extract text from PDF file using PyMuPDF
+    Extract text from PDF content using PyMuPDF
     
     Args:
-        file_path: Path to the PDF file
+        data: Raw bytes of the PDF file
         
     Returns:
         Extracted text as string
     """
     try:
-        doc = fitz.open(file_path)
-        text = ""
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text += page.get_text()
-        
-        doc.close()
-        return text
+        with fitz.open(stream=data, filetype='pdf') as doc:
+            return "\n".join([page.get_text('text') for page in doc])
     
     except Exception as e:
-        logger.error(f"Error extracting text from PDF {file_path}: {e}")
+        logger.error(f"Error extracting text from PDF: {e}")
         raise Exception(f"Failed to extract text from PDF: {e}")
 
-def extract_text_from_docx(file_path: str) -> str:
+def extract_text_from_docx(data: bytes) -> str:
     """
-    Extract text from DOCX file using python-docx
+    Extract text from DOCX content using python-docx
     
     Args:
-        file_path: Path to the DOCX file
+        data: Raw bytes of the DOCX file
         
     Returns:
         Extracted text as string
     """
     try:
-        doc = Document(file_path)
-        text = ""
+        doc = Document(BytesIO(data))
         
         # Extract text from paragraphs
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        parts = [paragraph.text + "\n" for paragraph in doc.paragraphs]
         
         # Extract text from tables
         for table in doc.tables:
             for row in table.rows:
-                for cell in row.cells:
-                    text += cell.text + " "
+                parts.extend(cell.text + " " for cell in row.cells)
         
-        return text
+        return "".join(parts)
     
     except Exception as e:
-        logger.error(f"Error extracting text from DOCX {file_path}: {e}")
+        logger.error(f"Error extracting text from DOCX: {e}")
         raise Exception(f"Failed to extract text from DOCX: {e}")
 
-def extract_text_from_file(file_path: str) -> str:
+def extract_text_from_bytes(data: bytes, extension: str) -> str:
     """
-    Extract text from file based on extension
+    Extract text from in-memory file content based on extension
     
     Args:
-        file_path: Path to the file
+        data: Raw bytes of the file
+        extension: File extension, with or without the leading dot
         
     Returns:
         Extracted text as string
     """
-    file_extension = os.path.splitext(file_path)[1].lower()
+    file_extension = '.' + extension.lower().lstrip('.')
     
     if file_extension == '.pdf':
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(data)
     elif file_extension == '.docx':
-        return extract_text_from_docx(file_path)
+        return extract_text_from_docx(data)
     else:
         raise ValueError(f"Unsupported file format: {file_extension}")
 
+def extract_text_from_file(file_path: str) -> str:
+    """
+    Extract text from file based on extension
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        Extracted text as string
+    """
+    file_extension = os.path.splitext(file_path)[1].lower()
+    if file_extension not in ('.pdf', '.docx'):
+        raise ValueError(f"Unsupported file format: {file_extension}")
+    
+    with open(file_path, 'rb') as f:
+        return extract_text_from_bytes(f.read(), file_extension)
+
 def preprocess_text(text: str) -> str:
     """
     Preprocess text for classification
@@ -119,32 +162,57 @@ def preprocess_text(text: str) -> str:
         Preprocessed text
     """
     try:
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters and digits
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Tokenize
-        tokens = word_tokenize(text)
-        
-        # Remove stopwords and apply stemming
-        processed_tokens = []
-        for token in tokens:
-            if token not in stop_words and len(token) > 2:
-                stemmed_token = stemmer.stem(token)
-                processed_tokens.append(stemmed_token)
+        # Lowercase and tokenize in a single regex pass
+        tokens = _TOKEN_RE.findall(text.lower())
         
-        return ' '.join(processed_tokens)
+        # Stem each distinct non-stopword once, then map every occurrence
+        stems = {token: _stem(token) for token in set(tokens).difference(stop_words)}
+        return ' '.join([stems[token] for token in tokens if token in stems])
     
     except Exception as e:
         logger.error(f"Error preprocessing text: {e}")
         return text  # Return original text if preprocessing fails
 
-def create_stub_model_and_vectorizer() -> Tuple[RandomForestClassifier, TfidfVectorizer]:
+def preprocess_texts(texts: List[str]) -> List[str]:
+    """
+    Preprocess a batch of texts for training or classification
+    
+    Large batches are spread over worker processes, since stemming is
+    pure Python and holds the GIL.
+    
+    Args:
+        texts: Raw texts to preprocess
+        
+    Returns:
+        List of preprocessed texts, in input order
+    """
+    if len(texts) < PARALLEL_MIN_BATCH or PREPROCESS_N_JOBS == 1:
+        return [preprocess_text(text) for text in texts]
+    
+    return Parallel(n_jobs=PREPROCESS_N_JOBS, backend='loky', batch_size=16)(
+        delayed(preprocess_text)(text) for text in texts
+    )
+
+def vectorize_texts(vectorizer: Pipeline, texts: List[str]):
+    """
+    Turn preprocessed texts into TF-IDF rows
+    
+    For the hashing pipeline the hashed counts are freshly allocated, so the
+    TF-IDF step reweights them in place instead of copying the matrix.
+    
+    Args:
+        vectorizer: Fitted hashing/TF-IDF pipeline
+        texts: Preprocessed texts
+        
+    Returns:
+        Sparse matrix with one row per text
+    """
+    if isinstance(vectorizer, Pipeline) and 'hash' in vectorizer.named_steps:
+        counts = vectorizer.named_steps['hash'].transform(texts)
+        return vectorizer.named_steps['tfidf'].transform(counts, copy=False)
+    return vectorizer.transform(texts)
+
+def create_stub_model_and_vectorizer() -> Tuple[LogisticRegression, Pipeline]:
     """
     Create a stub model and vectorizer for testing purposes
     This would be replaced with a properly trained model in production
@@ -202,38 +270,74 @@ def create_stub_model_and_vectorizer() -> Tuple[RandomForestClassifier, TfidfVec
             texts.append(sample)
             labels.append(category_idx)
     
-    # Create and fit vectorizer
-    vectorizer = TfidfVectorizer(
-        max_features=5000,
-        ngram_range=(1, 2),
-        min_df=1,
-        max_df=0.95,
-        stop_words='english'
-    )
+    # Create and fit vectorizer; feature hashing avoids a vocabulary lookup per n-gram
+    vectorizer = Pipeline([
+        ('hash', HashingVectorizer(
+            n_features=2 ** int(math.log2(TFIDF_MAX_FEATURES)),
+            ngram_range=(1, TFIDF_NGRAM_MAX),
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32
+        )),
+        ('tfidf', TfidfTransformer(sublinear_tf=True))
+    ])
     
-    X = vectorizer.fit_transform(texts)
+    # Fit on preprocessed text so training matches the inference tokens
+    X = vectorizer.fit_transform(preprocess_texts(texts))
     
-    # Create and train model
-    model = RandomForestClassifier(
-        n_estimators=100,
-        random_state=42,
-        max_depth=20,
-        min_samples_split=5,
-        min_samples_leaf=2
+    # Create and train model; a linear model scores sparse TF-IDF rows directly
+    model = LogisticRegression(
+        C=10.0,
+        max_iter=1000,
+        random_state=42
     )
     
     model.fit(X, labels)
+    downcast_to_float32(model, vectorizer)
     
     logger.info("Stub model and vectorizer created successfully")
     return model, vectorizer
 
-def save_model_and_vectorizer(model: RandomForestClassifier, vectorizer: TfidfVectorizer, model_dir: str = 'model') -> None:
+def downcast_to_float32(model: LogisticRegression, vectorizer: Pipeline) -> None:
+    """
+    Store IDF weights and model coefficients as float32 in place
+    
+    float64 doubles the bytes moved by the sparse dot product at inference
+    without improving a 5-class linear model's predictions.
+    
+    Args:
+        model: Trained classifier model
+        vectorizer: Fitted hashing/TF-IDF pipeline
+    """
+    tfidf = vectorizer.named_steps['tfidf']
+    idf = tfidf.idf_.astype(np.float32)
+    if hasattr(tfidf, '_idf_diag'):
+        # Older scikit-learn keeps IDF as a diagonal matrix whose idf_ setter upcasts to float64
+        tfidf._idf_diag = sp.diags(idf, offsets=0, shape=(idf.shape[0], idf.shape[0]), format='csr', dtype=np.float32)
+    else:
+        tfidf.idf_ = idf
+    model.coef_ = model.coef_.astype(np.float32)
+    model.intercept_ = model.intercept_.astype(np.float32)
+
+def _dump_atomic(obj, path: str) -> None:
+    """Dump obj with joblib so concurrent readers never see a partial file"""
+    # A per-process sibling file keeps the rename on one filesystem and the umask permissions
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_model_and_vectorizer(model: LogisticRegression, vectorizer: Pipeline, model_dir: str = 'model') -> None:
     """
     Save model and vectorizer to disk
     
     Args:
         model: Trained classifier model
-        vectorizer: Fitted TfidfVectorizer
+        vectorizer: Fitted hashing/TF-IDF pipeline
         model_dir: Directory to save models
     """
     os.makedirs(model_dir, exist_ok=True)
@@ -241,13 +345,14 @@ def save_model_and_vectorizer(model: RandomForestClassifier, vectorizer: TfidfVe
     model_path = os.path.join(model_dir, 'classifier_model.joblib')
     vectorizer_path = os.path.join(model_dir, 'vectorizer.joblib')
     
-    joblib.dump(model, model_path)
-    joblib.dump(vectorizer, vectorizer_path)
+    # Write through temp files so processes loading at import time never race a partial dump
+    _dump_atomic(model, model_path)
+    _dump_atomic(vectorizer, vectorizer_path)
     
     logger.info(f"Model saved to {model_path}")
     logger.info(f"Vectorizer saved to {vectorizer_path}")
 
-def load_model_and_vectorizer(model_dir: str = 'model') -> Tuple[RandomForestClassifier, TfidfVectorizer]:
+def load_model_and_vectorizer(model_dir: str = 'model') -> Tuple[LogisticRegression, Pipeline]:
     """
     Load model and vectorizer from disk, create stub if not found
     
@@ -263,8 +368,9 @@ def load_model_and_vectorizer(model_dir: str = 'model') -> Tuple[RandomForestCla
     try:
         if os.path.exists(model_path) and os.path.exists(vectorizer_path):
             logger.info("Loading existing model and vectorizer...")
-            model = joblib.load(model_path)
-            vectorizer = joblib.load(vectorizer_path)
+            # Memory-map the weight arrays so forked workers share the same pages
+            model = joblib.load(model_path, mmap_mode='r')
+            vectorizer = joblib.load(vectorizer_path, mmap_mode='r')
             logger.info("Model and vectorizer loaded successfully")
             return model, vectorizer
         else:
@@ -280,13 +386,13 @@ def load_model_and_vectorizer(model_dir: str = 'model') -> Tuple[RandomForestCla
         save_model_and_vectorizer(model, vectorizer, model_dir)
         return model, vectorizer
 
-def validate_model_performance(model: RandomForestClassifier, vectorizer: TfidfVectorizer) -> dict:
+def validate_model_performance(model: LogisticRegression, vectorizer: Pipeline) -> dict:
     """
     Validate model performance with test samples
     
     Args:
         model: Trained classifier model
-        vectorizer: Fitted TfidfVectorizer
+        vectorizer: Fitted hashing/TF-IDF pipeline
         
     Returns:
         Dictionary with performance metrics
@@ -303,10 +409,10 @@ def validate_model_performance(model: RandomForestClassifier, vectorizer: TfidfV
     total_predictions = len(test_samples)
     categories = ['Legal', 'HR', 'Finance', 'Medical', 'Technical']
     
-    for text, expected_category in test_samples:
-        processed_text = preprocess_text(text)
-        text_vector = vectorizer.transform([processed_text])
-        prediction = model.predict(text_vector)[0]
+    processed_texts = preprocess_texts([text for text, _ in test_samples])
+    predictions = model.predict(vectorize_texts(vectorizer, processed_texts))
+    
+    for prediction, (_, expected_category) in zip(predictions, test_samples):
         predicted_category = categories[prediction]
         
         if predicted_category == expected_category:
@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration for Document Classification API
+"""
+
+import os
+
+# Make the app modules importable the same way run.py does
+pythonpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app')
+wsgi_app = 'classifier_api:app'
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+
+# One process per core, each with a small thread pool for upload I/O
+workers = int(os.getenv('GUNICORN_WORKERS', max(2, os.cpu_count() or 1)))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = 120
+
+# Workers already cover every core, so batch preprocessing stays in-process
+os.environ.setdefault('PREPROCESS_N_JOBS', '1')
+
+# Load the model once in the master; workers share it copy-on-write after fork
+preload_app = True
@@ -59,7 +59,7 @@ def install_dependencies():
 
 def create_directories():
     """Create necessary directories"""
-    directories = ['model', 'temp_uploads', 'tests']
+    directories = ['model', 'tests']
     
     for directory in directories:
         if not os.path.exists(directory):
@@ -100,7 +100,7 @@ def run_tests():
     else:  # Unix/Linux/macOS
         python_cmd = 'venv/bin/python'
     
-    return run_command(f'{python_cmd} -m pytest tests/ -v', 'Running tests')
+    return run_command(f'{python_cmd} -m pytest tests/ -v -n auto', 'Running tests')
 
 def print_next_steps():
     """Print next steps for the user"""
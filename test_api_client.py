@@ -5,60 +5,150 @@ Demonstrates how to use the API endpoints
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import argparse
 import json
-import os
 import sys
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from docx import Document
 
+# orjson parses and serializes much faster; fall back to the stdlib when it is missing
+try:
+    import orjson
+    
+    def parse_json(content):
+        return orjson.loads(content)
+    
+    def format_json(data):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def parse_json(content):
+        return json.loads(content)
+    
+    def format_json(data):
+        return json.dumps(data, indent=2)
+
 # API Configuration
 API_BASE_URL = 'http://localhost:5000'
 AUTH_TOKEN = 'Bearer stub_token_12345'
 HEADERS = {'Authorization': AUTH_TOKEN}
+HEALTH_CHECK_TIMEOUT = (1.0, 2.0)  # (connect, read) seconds
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Shared session so every call reuses pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
 def test_health_check():
     """Test the health check endpoint"""
     print("🔍 Testing health check endpoint...")
     try:
-        response = requests.get(f'{API_BASE_URL}/status')
+        # Only the status code matters, so skip the body and bound the wait
+        response = SESSION.head(f'{API_BASE_URL}/status', timeout=HEALTH_CHECK_TIMEOUT)
         print(f"Status: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
         return response.status_code == 200
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error: {type(e).__name__} while contacting {API_BASE_URL}")
         return False
 
 def test_get_categories():
-    """Test the categories endpoint"""
-    print("\n📋 Testing categories endpoint...")
+    """Test the categories endpoint; returns (report lines, success)"""
+    lines = ["\n📋 Testing categories endpoint..."]
     try:
-        response = requests.get(f'{API_BASE_URL}/categories')
-        print(f"Status: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.status_code == 200
+        response = SESSION.get(f'{API_BASE_URL}/categories')
+        lines.append(f"Status: {response.status_code}")
+        lines.append(f"Response: {format_json(parse_json(response.content))}")
+        return lines, response.status_code == 200
     except Exception as e:
-        print(f"❌ Error: {e}")
-        return False
+        lines.append(f"❌ Error: {e}")
+        return lines, False
 
-def create_sample_docx(content, filename):
-    """Create a sample DOCX file for testing"""
+@lru_cache(maxsize=16)
+def create_sample_docx(content):
+    """Create the bytes of a sample DOCX file, serializing each content once"""
     doc = Document()
     doc.add_paragraph(content)
     
     # Save to BytesIO
     file_stream = BytesIO()
     doc.save(file_stream)
-    file_stream.seek(0)
     
-    # Save to file for testing
-    with open(filename, 'wb') as f:
-        f.write(file_stream.getvalue())
+    return file_stream.getvalue()
+
+def report_result(doc, status_code, result):
+    """Turn one classification response into (report lines, result)"""
+    lines = [
+        f"\n🔬 Testing: {doc['filename']} (Expected: {doc['expected_category']})",
+        f"Status: {status_code}"
+    ]
+    
+    if 'category' in result:
+        lines.append(f"✅ Classified as: {result['category']}")
+        lines.append(f"Confidence: {result['confidence']:.3f}")
+        if 'processing_time' in result:
+            lines.append(f"Processing time: {result['processing_time']:.3f}s")
+        
+        # Check if prediction matches expected
+        correct = result['category'] == doc['expected_category']
+        lines.append(f"Prediction correct: {'✅' if correct else '❌'}")
+        
+        return lines, {
+            'filename': doc['filename'],
+            'expected': doc['expected_category'],
+            'predicted': result['category'],
+            'confidence': result['confidence'],
+            'correct': correct
+        }
     
-    return filename
+    lines.append(f"❌ Error: {result}")
+    return lines, {
+        'filename': doc['filename'],
+        'expected': doc['expected_category'],
+        'predicted': 'ERROR',
+        'confidence': 0,
+        'correct': False
+    }
+
+def classify_one(doc):
+    """Upload one sample document; returns (report lines, result)"""
+    try:
+        # Upload and classify the in-memory sample document
+        files = {'file': (doc['filename'], create_sample_docx(doc['content']), DOCX_MIME_TYPE)}
+        response = SESSION.post(f'{API_BASE_URL}/classify', files=files)
+        return report_result(doc, response.status_code, parse_json(response.content))
+    
+    except Exception as e:
+        return report_result(doc, 'ERROR', {'error': f"Error processing {doc['filename']}: {e}"})
+
+def classify_batch(test_documents):
+    """
+    Upload all sample documents in a single /classify_batch request
+    Returns: (batch report lines, list of (report lines, result)), or None if
+    the server has no batch endpoint
+    """
+    files = [
+        ('files', (doc['filename'], create_sample_docx(doc['content']), DOCX_MIME_TYPE))
+        for doc in test_documents
+    ]
+    response = SESSION.post(f'{API_BASE_URL}/classify_batch', files=files)
+    if response.status_code in (404, 405, 501):
+        return None
+    
+    if response.status_code != 200:
+        return [], [report_result(doc, response.status_code, parse_json(response.content)) for doc in test_documents]
+    
+    data = parse_json(response.content)
+    return (
+        [f"Batch processing time: {data['processing_time']:.3f}s"],
+        [report_result(doc, response.status_code, result) for doc, result in zip(test_documents, data['results'])]
+    )
 
 def test_document_classification():
-    """Test document classification with sample documents"""
-    print("\n📄 Testing document classification...")
+    """Test document classification with sample documents; returns (report lines, results)"""
+    lines = ["\n📄 Testing document classification..."]
     
     # Sample documents for each category
     test_documents = [
@@ -89,102 +179,68 @@ def test_document_classification():
         }
     ]
     
-    results = []
+    # Classify everything in one request when the server supports it
+    try:
+        batch = classify_batch(test_documents)
+    except Exception as e:
+        lines.append(f"❌ Batch classification failed: {e}")
+        batch = None
     
-    for doc in test_documents:
-        print(f"\n🔬 Testing: {doc['filename']} (Expected: {doc['expected_category']})")
+    if batch is not None:
+        batch_lines, reports = batch
+        lines.extend(batch_lines)
+    else:
+        lines.append("Batch endpoint not available, classifying documents one by one")
         
-        try:
-            # Create sample document
-            filename = create_sample_docx(doc['content'], doc['filename'])
-            
-            # Upload and classify
-            with open(filename, 'rb') as f:
-                files = {'file': f}
-                response = requests.post(
-                    f'{API_BASE_URL}/classify',
-                    headers=HEADERS,
-                    files=files
-                )
-            
-            print(f"Status: {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"✅ Classified as: {result['category']}")
-                print(f"Confidence: {result['confidence']:.3f}")
-                print(f"Processing time: {result['processing_time']:.3f}s")
-                
-                # Check if prediction matches expected
-                correct = result['category'] == doc['expected_category']
-                print(f"Prediction correct: {'✅' if correct else '❌'}")
-                
-                results.append({
-                    'filename': doc['filename'],
-                    'expected': doc['expected_category'],
-                    'predicted': result['category'],
-                    'confidence': result['confidence'],
-                    'correct': correct
-                })
-            else:
-                print(f"❌ Error: {response.json()}")
-                results.append({
-                    'filename': doc['filename'],
-                    'expected': doc['expected_category'],
-                    'predicted': 'ERROR',
-                    'confidence': 0,
-                    'correct': False
-                })
-            
-            # Clean up
-            if os.path.exists(filename):
-                os.remove(filename)
-                
-        except Exception as e:
-            print(f"❌ Error processing {doc['filename']}: {e}")
-            results.append({
-                'filename': doc['filename'],
-                'expected': doc['expected_category'],
-                'predicted': 'ERROR',
-                'confidence': 0,
-                'correct': False
-            })
-    
-    return results
+        # Uploads are independent, so send them concurrently
+        with ThreadPoolExecutor(max_workers=len(test_documents)) as executor:
+            reports = list(executor.map(classify_one, test_documents))
+    
+    results = []
+    for report_lines, result in reports:
+        lines.extend(report_lines)
+        results.append(result)
+    
+    return lines, results
 
 def test_authentication():
-    """Test authentication requirements"""
-    print("\n🔐 Testing authentication...")
+    """Test authentication requirements; returns (report lines, None)"""
+    lines = ["\n🔐 Testing authentication..."]
     
     # Test without token
-    print("Testing without token...")
-    response = requests.post(f'{API_BASE_URL}/classify')
-    print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    lines.append("Testing without token...")
+    # A None value removes the session's default Authorization header
+    response = SESSION.post(f'{API_BASE_URL}/classify', headers={'Authorization': None})
+    lines.append(f"Status: {response.status_code}")
+    lines.append(f"Response: {parse_json(response.content)}")
     
     # Test with invalid token
-    print("\nTesting with invalid token...")
+    lines.append("\nTesting with invalid token...")
     invalid_headers = {'Authorization': 'Bearer invalid_token'}
-    response = requests.post(f'{API_BASE_URL}/classify', headers=invalid_headers)
-    print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    response = SESSION.post(f'{API_BASE_URL}/classify', headers=invalid_headers)
+    lines.append(f"Status: {response.status_code}")
+    lines.append(f"Response: {parse_json(response.content)}")
+    
+    return lines, None
 
 def test_error_handling():
-    """Test error handling"""
-    print("\n⚠️  Testing error handling...")
+    """Test error handling; returns (report lines, None)"""
+    lines = ["\n⚠️  Testing error handling..."]
     
     # Test with no file
-    print("Testing with no file...")
-    response = requests.post(f'{API_BASE_URL}/classify', headers=HEADERS)
-    print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    lines.append("Testing with no file...")
+    response = SESSION.post(f'{API_BASE_URL}/classify')
+    lines.append(f"Status: {response.status_code}")
+    lines.append(f"Response: {parse_json(response.content)}")
     
     # Test with unsupported file type
-    print("\nTesting with unsupported file type...")
+    lines.append("\nTesting with unsupported file type...")
     files = {'file': ('test.txt', BytesIO(b'test content'), 'text/plain')}
-    response = requests.post(f'{API_BASE_URL}/classify', headers=HEADERS, files=files)
-    print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    response = SESSION.post(f'{API_BASE_URL}/classify', files=files)
+    lines.append(f"Status: {response.status_code}")
+    lines.append(f"Response: {parse_json(response.content)}")
+    
+    return lines, None
 
 def print_summary(results):
     """Print test summary"""
@@ -206,8 +262,35 @@ def print_summary(results):
         status = "✅" if result['correct'] else "❌"
         print(f"{status} {result['filename']}: {result['expected']} → {result['predicted']} ({result['confidence']:.3f})")
 
-def main():
+# Tests run after the health check, cheap probes first
+TESTS = (
+    ('categories', test_get_categories),
+    ('auth', test_authentication),
+    ('errors', test_error_handling),
+    ('classify', test_document_classification),
+)
+
+def parse_args(argv=None):
+    """Parse command line options selecting which tests to run"""
+    names = [name for name, _ in TESTS]
+    parser = argparse.ArgumentParser(description='Document Classification API test client')
+    parser.add_argument('--only', help=f'comma-separated tests to run ({", ".join(names)})')
+    parser.add_argument('--fast', action='store_true', help='skip the slow classification tests')
+    args = parser.parse_args(argv)
+    
+    selected = args.only.split(',') if args.only else names
+    unknown = set(selected) - set(names)
+    if unknown:
+        parser.error(f'unknown tests: {", ".join(sorted(unknown))}')
+    if args.fast:
+        selected = [name for name in selected if name != 'classify']
+    
+    return [(name, test) for name, test in TESTS if name in selected]
+
+def main(argv=None):
     """Main test function"""
+    tests = parse_args(argv)
+    
     print("🚀 Document Classification API Test Client")
     print("=" * 50)
     
@@ -216,18 +299,21 @@ def main():
         print("❌ API is not available. Please start the server first.")
         sys.exit(1)
     
-    # Run tests
-    test_get_categories()
-    test_authentication()
-    test_error_handling()
-    
-    # Test classification
-    results = test_document_classification()
+    # Run the selected tests together, printing each one's report in order
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(tests))) as executor:
+        futures = [executor.submit(test) for _, test in tests]
+        for (name, _), future in zip(tests, futures):
+            lines, outcome = future.result()
+            print("\n".join(lines))
+            outcomes[name] = outcome
     
     # Print summary
-    print_summary(results)
+    if 'classify' in outcomes:
+        print_summary(outcomes['classify'])
     
     print("\n✅ All tests completed!")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    with SESSION:
+        main()
\ No newline at end of file
@@ -4,66 +4,87 @@ Unit tests for Document Classification API
 
 import os
 import sys
+import hashlib
 import pytest
-import json
-import tempfile
+from collections import OrderedDict
+from functools import lru_cache
 from io import BytesIO
 
+import numpy as np
+from werkzeug.datastructures import FileStorage
+
 # Add the app directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
 
+import classifier_api
 from classifier_api import app
-from utils import create_stub_model_and_vectorizer, save_model_and_vectorizer
+from utils import PARALLEL_MIN_BATCH, create_stub_model_and_vectorizer
+
+@lru_cache(maxsize=16)
+def build_docx_bytes(content):
+    """Serialize a single-paragraph DOCX, once per distinct content"""
+    try:
+        from docx import Document
+        doc = Document()
+        doc.add_paragraph(content)
+        
+        # Save to BytesIO
+        file_stream = BytesIO()
+        doc.save(file_stream)
+        return file_stream.getvalue()
+    except ImportError:
+        # Fallback if docx not available
+        return b'Mock DOCX content for legal contract employment terms'
+
+_LEGAL_DOCX_BYTES = build_docx_bytes(
+    "This is a legal contract between parties regarding employment terms and conditions."
+)
+
+# Authentication headers for testing
+AUTH_HEADERS = {'Authorization': 'Bearer stub_token_12345'}
+
+_EXPECTED_CATEGORIES = frozenset(('Legal', 'HR', 'Finance', 'Medical', 'Technical'))
+
+@pytest.fixture(scope='session', autouse=True)
+def stub_model():
+    """Serve a freshly built stub model to the API, once per session"""
+    app.config['TESTING'] = True
+    classifier_api.model, classifier_api.vectorizer = create_stub_model_and_vectorizer()
+
+@pytest.fixture(scope='module')
+def client():
+    """Create test client shared by the API tests"""
+    with app.test_client() as client:
+        yield client
 
 class TestDocumentClassificationAPI:
     """Test suite for the Document Classification API"""
     
-    @pytest.fixture
-    def client(self):
-        """Create test client"""
-        app.config['TESTING'] = True
-        app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
-        
-        # Ensure model is available for testing
-        model, vectorizer = create_stub_model_and_vectorizer()
-        save_model_and_vectorizer(model, vectorizer, 'model')
-        
-        with app.test_client() as client:
-            yield client
-    
-    @pytest.fixture
-    def auth_headers(self):
-        """Authentication headers for testing"""
-        return {'Authorization': 'Bearer stub_token_12345'}
-    
     def test_health_check(self, client):
         """Test the /status endpoint"""
         response = client.get('/status')
         assert response.status_code == 200
         
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['status'] == 'healthy'
-        assert 'timestamp' in data
-        assert 'model_loaded' in data
-        assert 'supported_formats' in data
-        assert 'categories' in data
-        assert set(data['categories']) == {'Legal', 'HR', 'Finance', 'Medical', 'Technical'}
+        assert {'timestamp', 'model_loaded', 'supported_formats', 'categories'} <= data.keys()
+        assert frozenset(data['categories']) == _EXPECTED_CATEGORIES
     
     def test_get_categories(self, client):
         """Test the /categories endpoint"""
         response = client.get('/categories')
         assert response.status_code == 200
         
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'categories' in data
-        assert set(data['categories']) == {'Legal', 'HR', 'Finance', 'Medical', 'Technical'}
+        assert frozenset(data['categories']) == _EXPECTED_CATEGORIES
     
     def test_classify_without_token(self, client):
         """Test classification without authentication token"""
         response = client.post('/classify')
         assert response.status_code == 401
         
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'error' in data
         assert 'Token is missing' in data['error']
     
@@ -73,82 +94,74 @@ class TestDocumentClassificationAPI:
         response = client.post('/classify', headers=headers)
         assert response.status_code == 401
         
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'error' in data
         assert 'Invalid token' in data['error']
     
-    def test_classify_no_file(self, client, auth_headers):
+    def test_classify_no_file(self, client):
         """Test classification without file upload"""
-        response = client.post('/classify', headers=auth_headers)
+        response = client.post('/classify', headers=AUTH_HEADERS)
         assert response.status_code == 400
         
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'error' in data
         assert 'No file provided' in data['error']
     
-    def test_classify_empty_filename(self, client, auth_headers):
+    def test_classify_empty_filename(self, client):
         """Test classification with empty filename"""
         data = {'file': (BytesIO(b''), '')}
         response = client.post('/classify', 
                              data=data, 
-                             headers=auth_headers,
+                             headers=AUTH_HEADERS,
                              content_type='multipart/form-data')
         assert response.status_code == 400
         
-        response_data = json.loads(response.data)
+        response_data = response.get_json()
         assert 'error' in response_data
         assert 'No file selected' in response_data['error']
     
-    def test_classify_unsupported_format(self, client, auth_headers):
+    def test_classify_unsupported_format(self, client):
         """Test classification with unsupported file format"""
         data = {'file': (BytesIO(b'test content'), 'test.txt')}
         response = client.post('/classify', 
                              data=data, 
-                             headers=auth_headers,
+                             headers=AUTH_HEADERS,
                              content_type='multipart/form-data')
         assert response.status_code == 400
         
-        response_data = json.loads(response.data)
+        response_data = response.get_json()
         assert 'error' in response_data
         assert 'File type not supported' in response_data['error']
     
     def create_test_docx_content(self):
         """Create a simple test DOCX file content"""
-        try:
-            from docx import Document
-            doc = Document()
-            doc.add_paragraph("This is a legal contract between parties regarding employment terms and conditions.")
-            
-            # Save to BytesIO
-            file_stream = BytesIO()
-            doc.save(file_stream)
-            file_stream.seek(0)
-            return file_stream.getvalue()
-        except ImportError:
-            # Fallback if docx not available
-            return b'Mock DOCX content for legal contract employment terms'
-    
-    def test_classify_valid_docx(self, client, auth_headers):
+        return _LEGAL_DOCX_BYTES
+    
+    def test_classify_valid_docx(self, client):
         """Test classification with valid DOCX file"""
         docx_content = self.create_test_docx_content()
-        data = {'file': (BytesIO(docx_content), 'test_document.docx')}
+        data = {'file': FileStorage(
+            stream=BytesIO(docx_content),
+            filename='test_document.docx',
+            content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        )}
         
         response = client.post('/classify', 
                              data=data, 
-                             headers=auth_headers,
+                             headers=AUTH_HEADERS,
                              content_type='multipart/form-data')
         
         # Should succeed or fail gracefully
         assert response.status_code in [200, 400, 500]
         
         if response.status_code == 200:
-            response_data = json.loads(response.data)
+            response_data = response.get_json()
             assert 'category' in response_data
             assert 'confidence' in response_data
-            assert response_data['category'] in ['Legal', 'HR', 'Finance', 'Medical', 'Technical']
+            assert response_data['category'] in _EXPECTED_CATEGORIES
             assert 0 <= response_data['confidence'] <= 1
     
-    def test_classify_pdf_mock(self, client, auth_headers):
+    def test_classify_pdf_mock(self, client):
         """Test classification with mock PDF file"""
         # Create mock PDF content
         pdf_content = b'%PDF-1.4\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n'
@@ -156,35 +169,139 @@ class TestDocumentClassificationAPI:
         
         response = client.post('/classify', 
                              data=data, 
-                             headers=auth_headers,
+                             headers=AUTH_HEADERS,
                              content_type='multipart/form-data')
         
         # Should handle the mock PDF (might fail due to invalid format, which is expected)
         assert response.status_code in [200, 400, 500]
     
+    def test_classify_repeat_upload_uses_cache(self, client, monkeypatch):
+        """Test that re-uploading a document skips text extraction"""
+        docx_content = build_docx_bytes("Patient medical history and treatment plan from the hospital clinic.")
+        
+        first = client.post('/classify', 
+                          data={'file': (BytesIO(docx_content), 'medical.docx')}, 
+                          headers=AUTH_HEADERS,
+                          content_type='multipart/form-data')
+        assert first.status_code == 200
+        
+        def fail_extraction(*args):
+            raise AssertionError('extraction should be skipped on a cache hit')
+        monkeypatch.setattr(classifier_api, 'extract_text_from_bytes', fail_extraction)
+        
+        second = client.post('/classify', 
+                           data={'file': (BytesIO(docx_content), 'medical.docx')}, 
+                           headers=AUTH_HEADERS,
+                           content_type='multipart/form-data')
+        assert second.status_code == 200
+        assert second.get_json()['category'] == first.get_json()['category']
+    
+    def test_classify_short_text_not_cached(self, client):
+        """Test that documents failing the length check are not cached"""
+        docx_content = build_docx_bytes("Hi")
+        
+        response = client.post('/classify', 
+                             data={'file': (BytesIO(docx_content), 'short.docx')}, 
+                             headers=AUTH_HEADERS,
+                             content_type='multipart/form-data')
+        assert response.status_code == 400
+        assert 'Could not extract sufficient text' in response.get_json()['error']
+        assert classifier_api.get_cached_text(hashlib.sha1(docx_content).hexdigest()) is None
+    
+    def test_text_cache_evicts_least_recently_used(self, monkeypatch):
+        """Test LRU eviction once the cache is full"""
+        monkeypatch.setattr(classifier_api, '_text_cache', OrderedDict())
+        monkeypatch.setattr(classifier_api, 'TEXT_CACHE_SIZE', 2)
+        
+        classifier_api.cache_text('a', 'text a')
+        classifier_api.cache_text('b', 'text b')
+        assert classifier_api.get_cached_text('a') == 'text a'  # 'b' is now least recent
+        
+        classifier_api.cache_text('c', 'text c')
+        assert classifier_api.get_cached_text('b') is None
+        assert classifier_api.get_cached_text('a') == 'text a'
+        assert classifier_api.get_cached_text('c') == 'text c'
+    
+    def test_classify_batch_preserves_order(self, client):
+        """Test that batch results follow upload order"""
+        texts = [
+            "Quarterly budget report with revenue forecast and expense figures.",
+            "Software architecture design for the database server and network.",
+            "Employee onboarding handbook covering benefits and vacation policy.",
+        ]
+        files = [(BytesIO(build_docx_bytes(text)), f'doc{index}.docx') for index, text in enumerate(texts)]
+        
+        response = client.post('/classify_batch', 
+                             data={'files': files}, 
+                             headers=AUTH_HEADERS,
+                             content_type='multipart/form-data')
+        assert response.status_code == 200
+        
+        results = response.get_json()['results']
+        assert [result['filename'] for result in results] == ['doc0.docx', 'doc1.docx', 'doc2.docx']
+        assert all(result['category'] in _EXPECTED_CATEGORIES for result in results)
+    
+    def test_classify_batch_mixed_errors(self, client):
+        """Test that unclassifiable files get per-file errors"""
+        files = [
+            (BytesIO(b'test content'), 'notes.txt'),
+            (BytesIO(b'not a zip archive'), 'corrupt.docx'),
+            (BytesIO(build_docx_bytes("Hi")), 'short.docx'),
+            (BytesIO(_LEGAL_DOCX_BYTES), 'contract.docx'),
+        ]
+        
+        response = client.post('/classify_batch', 
+                             data={'files': files}, 
+                             headers=AUTH_HEADERS,
+                             content_type='multipart/form-data')
+        assert response.status_code == 200
+        
+        results = response.get_json()['results']
+        assert 'File type not supported' in results[0]['error']
+        assert 'Classification failed' in results[1]['error']
+        assert 'Could not extract sufficient text' in results[2]['error']
+        assert 'error' not in results[3]
+        assert results[3]['category'] in _EXPECTED_CATEGORIES
+    
+    def test_classify_batch_no_files(self, client):
+        """Test batch classification without file uploads"""
+        response = client.post('/classify_batch', headers=AUTH_HEADERS)
+        assert response.status_code == 400
+        
+        data = response.get_json()
+        assert 'error' in data
+        assert 'No files provided' in data['error']
+    
+    def test_classify_batch_without_token(self, client):
+        """Test batch classification without authentication token"""
+        response = client.post('/classify_batch')
+        assert response.status_code == 401
+        
+        data = response.get_json()
+        assert 'error' in data
+        assert 'Token is missing' in data['error']
+    
     def test_404_endpoint(self, client):
         """Test non-existent endpoint"""
         response = client.get('/nonexistent')
         assert response.status_code == 404
         
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'error' in data
         assert 'Endpoint not found' in data['error']
     
-    def test_file_too_large(self, client, auth_headers):
+    def test_file_too_large(self, client):
         """Test file size limit"""
-        # Create a large file (mock)
-        large_content = b'x' * (17 * 1024 * 1024)  # 17MB
-        data = {'file': (BytesIO(large_content), 'large_file.docx')}
-        
+        # Declare a 17MB body; the limit is enforced from Content-Length alone
         response = client.post('/classify', 
-                             data=data, 
-                             headers=auth_headers,
-                             content_type='multipart/form-data')
+                             data=b'', 
+                             headers=AUTH_HEADERS,
+                             content_type='multipart/form-data; boundary=x',
+                             environ_overrides={'CONTENT_LENGTH': str(17 * 1024 * 1024)})
         
         assert response.status_code == 413
         
-        response_data = json.loads(response.data)
+        response_data = response.get_json()
         assert 'error' in response_data
         assert 'File too large' in response_data['error']
 
@@ -223,6 +340,25 @@ class TestUtilityFunctions:
         assert all(0 <= prob <= 1 for prob in probabilities)
         assert abs(sum(probabilities) - 1.0) < 1e-6  # Probabilities sum to 1
     
+    def test_vectorize_texts_float32(self):
+        """Test that the downcast model and pipeline work in float32"""
+        from utils import preprocess_text, vectorize_texts
+        
+        model, vectorizer = create_stub_model_and_vectorizer()
+        text_vector = vectorize_texts(vectorizer, [preprocess_text("Quarterly budget and revenue forecast")])
+        
+        assert text_vector.dtype == np.float32
+        assert model.coef_.dtype == model.intercept_.dtype == np.float32
+    
+    def test_vectorizer_keeps_domain_terms(self):
+        """Test that terms surviving preprocessing are not dropped as stopwords"""
+        from utils import preprocess_text, vectorize_texts
+        
+        _, vectorizer = create_stub_model_and_vectorizer()
+        text_vector = vectorize_texts(vectorizer, [preprocess_text("system bill interest amount")])
+        
+        assert text_vector.nnz > 0
+    
     def test_text_preprocessing(self):
         """Test text preprocessing function"""
         from utils import preprocess_text
@@ -235,6 +371,21 @@ class TestUtilityFunctions:
         assert '123' not in processed
         assert '!@#' not in processed
     
+    @pytest.mark.parametrize('count, n_jobs', [
+        (3, -1),
+        (PARALLEL_MIN_BATCH, 1),
+        (PARALLEL_MIN_BATCH, 2),
+    ])
+    def test_preprocess_texts_matches_preprocess_text(self, count, n_jobs, monkeypatch):
+        """Test batch preprocessing on the serial and parallel paths"""
+        import utils
+        from utils import preprocess_text, preprocess_texts
+        
+        monkeypatch.setattr(utils, 'PREPROCESS_N_JOBS', n_jobs)
+        texts = [f"Document {index}: the contracts were signed by {index} employees" for index in range(count)]
+        
+        assert preprocess_texts(texts) == [preprocess_text(text) for text in texts]
+    
     def test_file_extension_handling(self):
         """Test file extension detection"""
         from utils import extract_text_from_file
@@ -242,6 +393,26 @@ class TestUtilityFunctions:
         # Test unsupported format
         with pytest.raises(ValueError):
             extract_text_from_file('test.txt')
+    
+    def test_extract_text_from_bytes_docx(self):
+        """Test in-memory DOCX extraction"""
+        from utils import extract_text_from_bytes
+        
+        text = extract_text_from_bytes(_LEGAL_DOCX_BYTES, 'docx')
+        assert 'legal contract between parties' in text
+    
+    def test_extract_text_from_bytes_extension_forms(self):
+        """Test that the extension is accepted with or without the leading dot"""
+        from utils import extract_text_from_bytes
+        
+        assert extract_text_from_bytes(_LEGAL_DOCX_BYTES, '.DOCX') == extract_text_from_bytes(_LEGAL_DOCX_BYTES, 'docx')
+    
+    def test_extract_text_from_bytes_unsupported(self):
+        """Test in-memory extraction with an unsupported extension"""
+        from utils import extract_text_from_bytes
+        
+        with pytest.raises(ValueError):
+            extract_text_from_bytes(b'test content', 'txt')
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file